@@ -14,21 +14,52 @@ Commands:
 Setup (for bot operator):
 1. Create a Telegram bot via @BotFather and get your bot token
 2. Get your predict.fun API key from https://predict.fun
-3. Set environment variables: TELEGRAM_BOT_TOKEN, PREDICT_API_KEY
-4. Run the bot: python predict_order_notifier.py
+3. Set environment variables: TELEGRAM_BOT_TOKEN, PREDICT_API_KEY (or put
+   them in a .env file next to this script, if python-dotenv is installed)
+4. Optionally set WEBHOOK_URL (public base URL) and PORT to receive updates
+   via a Telegram webhook instead of long polling; on Railway the public
+   domain is used automatically
+5. Optionally set IDLE_BACKOFF_MAX (e.g. 4) to check wallets without recent
+   fills less often; the first fill after a quiet period can then be reported
+   up to that many poll intervals late (off by default)
+6. Run the bot: python predict_order_notifier.py
 """
 
 import os
 import sys
 import time
 import json
+import math
 import re
+import atexit
+import hashlib
+import hmac
+import sqlite3
+import signal
 import logging
 import threading
+from collections import defaultdict
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlencode
 from datetime import datetime, timezone
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Optional, Dict, Callable
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
 
 # Configure logging
 logging.basicConfig(
@@ -42,6 +73,81 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# =============================================================================
+# JSON helpers (orjson when available, stdlib json otherwise)
+# =============================================================================
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+if orjson is not None:
+    def json_dumps(obj) -> bytes:
+        """Serialize obj to compact JSON bytes"""
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    
+    json_loads = orjson.loads
+else:
+    def json_dumps(obj) -> bytes:
+        """Serialize obj to compact JSON bytes"""
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    
+    json_loads = json.loads
+
+
+# =============================================================================
+# HTTP helpers
+# =============================================================================
+
+def create_session(pool_maxsize: int) -> requests.Session:
+    """Create a keep-alive session with connection pooling and retries on transient errors
+    
+    pool_maxsize should match the number of threads that can use the session
+    at once, so every concurrent request reuses a warm connection.
+    """
+    session = requests.Session()
+    # Skip the per-request proxy / netrc environment lookups
+    session.trust_env = False
+    adapter = HTTPAdapter(
+        pool_connections=1,  # each client talks to a single host
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # tokens added per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def consume(self, tokens: float = 1.0):
+        """Take tokens from the bucket, sleeping until enough are available"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now > self.updated:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = max(self.updated - now, 0) + (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+    
+    def hold(self, seconds: float):
+        """Empty the bucket and stop refilling it for the given number of seconds"""
+        with self._lock:
+            self.tokens = 0
+            self.updated = max(self.updated, time.monotonic() + seconds)
+
+
 # =============================================================================
 # Configuration
 # =============================================================================
@@ -52,11 +158,22 @@ class Config:
     telegram_bot_token: str
     predict_api_key: str
     poll_interval: int = 10
+    poll_concurrency: int = 20
     testnet: bool = False
+    webhook_url: Optional[str] = None
+    webhook_port: int = 8080
+    webhook_secret: Optional[str] = None
+    db_flush_interval: float = 2.0
+    idle_backoff_max: int = 1  # 1 disables idle backoff
+    seen_tx_error_rate: float = 0.001
 
 
 def load_config() -> Config:
     """Load configuration from environment variables"""
+    # Variables already set in the environment take precedence over .env
+    if load_dotenv:
+        load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+    
     telegram_bot_token = os.environ.get('TELEGRAM_BOT_TOKEN')
     predict_api_key = os.environ.get('PREDICT_API_KEY')
     
@@ -68,108 +185,516 @@ def load_config() -> Config:
         logger.error("Missing PREDICT_API_KEY environment variable")
         sys.exit(1)
     
+    webhook_url = os.environ.get('WEBHOOK_URL')
+    if not webhook_url and os.environ.get('RAILWAY_PUBLIC_DOMAIN'):
+        webhook_url = f"https://{os.environ['RAILWAY_PUBLIC_DOMAIN']}"
+    
+    seen_tx_error_rate = os.environ.get('SEEN_TX_ERROR_RATE', '0.001')
+    try:
+        seen_tx_error_rate = float(seen_tx_error_rate)
+    except ValueError:
+        seen_tx_error_rate = None
+    if seen_tx_error_rate is None or not 0 < seen_tx_error_rate < 1:
+        logger.error("SEEN_TX_ERROR_RATE must be a number between 0 and 1 (exclusive)")
+        sys.exit(1)
+    
     return Config(
         telegram_bot_token=telegram_bot_token,
         predict_api_key=predict_api_key,
         poll_interval=int(os.environ.get('POLL_INTERVAL', '10')),
-        testnet=os.environ.get('TESTNET', 'false').lower() == 'true'
+        poll_concurrency=max(1, int(os.environ.get('POLL_CONCURRENCY', '20'))),
+        testnet=os.environ.get('TESTNET', 'false').lower() == 'true',
+        webhook_url=webhook_url or None,
+        webhook_port=int(os.environ.get('PORT', '8080')),
+        webhook_secret=os.environ.get('WEBHOOK_SECRET') or None,
+        db_flush_interval=float(os.environ.get('DB_FLUSH_INTERVAL', '2')),
+        idle_backoff_max=int(os.environ.get('IDLE_BACKOFF_MAX', '1')),
+        seen_tx_error_rate=seen_tx_error_rate
     )
 
 
 # =============================================================================
-# User Database (JSON file-based)
+# User Database (SQLite)
 # =============================================================================
 
+# Number of transaction hashes remembered per user (up to twice this between trims)
+MAX_SEEN_TX_HASHES = 500
+
+# Key names used by the JSON database that predates SQLite (compact and long forms)
+_LEGACY_JSON_KEYS = {
+    'w': 'wallet_address',
+    'u': 'username',
+    'r': 'registered_at',
+    'th': 'seen_tx_hashes',
+    'a': 'active',
+}
+
+# Rows live in the primary-key b-tree itself (no separate rowid table)
+_SEEN_TX_TABLE = """
+CREATE TABLE IF NOT EXISTS {name} (
+    chat_id TEXT NOT NULL,
+    tx_hash BLOB NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, tx_hash)
+) WITHOUT ROWID;
+"""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    chat_id TEXT PRIMARY KEY,
+    wallet_address TEXT NOT NULL,
+    username TEXT,
+    registered_at REAL,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value
+);
+""" + _SEEN_TX_TABLE.format(name='seen_tx') + """
+CREATE INDEX IF NOT EXISTS seen_tx_by_age ON seen_tx (chat_id, seen_at);
+"""
+
+
+def _tx_key(tx_hash: str) -> bytes:
+    """Compact form of a transaction hash: the raw 32 bytes of 0x-prefixed hex"""
+    if tx_hash.startswith('0x'):
+        try:
+            return bytes.fromhex(tx_hash[2:])
+        except ValueError:
+            pass
+    return tx_hash.encode()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of byte strings; no false negatives, error_rate false positives"""
+    
+    __slots__ = ('size', 'hashes', 'bits', 'count')
+    
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, item: bytes):
+        """Bit positions for an item (double hashing over one blake2b digest)"""
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+    
+    def add(self, item: bytes):
+        """Add an item to the filter"""
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+    
+    def __contains__(self, item: bytes) -> bool:
+        bits = self.bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+@dataclass(slots=True)
+class UserRecord:
+    """A registered user"""
+    wallet_address: str
+    username: Optional[str] = None
+    registered_at: Optional[float] = None  # epoch seconds
+    active: bool = True
+
+
 class UserDatabase:
-    """Simple JSON file-based database for user registrations"""
+    """SQLite database (WAL mode) for user registrations and seen transactions
+
+    Seen hashes are mirrored in memory as one Bloom filter per user, so
+    add_seen_tx recognizes new hashes without touching the database; filter
+    hits are confirmed against the table (a false positive, at roughly
+    ``seen_tx_error_rate``, costs one extra lookup). A user's filter and rows
+    are trimmed back to the newest MAX_SEEN_TX_HASHES once twice that many
+    have been added. Writes of seen hashes are queued and committed together by a
+    background thread at most once per ``flush_interval`` seconds (and on
+    exit); registrations are written immediately. A legacy users.json is
+    imported on first start.
+    """
     
-    def __init__(self, filepath: str = "users.json"):
+    def __init__(self, filepath: str = "users.db", legacy_json_path: str = "users.json",
+                 flush_interval: float = 2.0, seen_tx_error_rate: float = 0.001):
         self.filepath = filepath
-        self.users: Dict[str, dict] = {}  # chat_id -> user_data
-        self._load()
+        self.flush_interval = flush_interval
+        self.seen_tx_error_rate = seen_tx_error_rate
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(filepath, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate_json(legacy_json_path)
+        self._migrate_rowid_table()
+        self._migrate_hex_hashes()
+        
+        # chat_id -> Bloom filter of seen hashes
+        self._seen_tx: Dict[str, BloomFilter] = {}
+        self._load_seen_tx()
+        
+        # Queued (sql, params) writes, applied in order by flush(), and the
+        # (chat_id, hash) pairs they insert
+        self._pending: list = []
+        self._unflushed: set = set()
+        self._dirty = threading.Event()
+        
+        count = self._conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        logger.info(f"Loaded {count} registered users")
+        
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
     
-    def _load(self):
-        """Load users from file"""
-        if os.path.exists(self.filepath):
-            try:
-                with open(self.filepath, 'r') as f:
-                    self.users = json.load(f)
-                logger.info(f"Loaded {len(self.users)} registered users")
-            except Exception as e:
-                logger.error(f"Error loading user database: {e}")
-                self.users = {}
-        else:
-            self.users = {}
+    def _new_seen_filter(self) -> BloomFilter:
+        """Empty seen-hash filter, sized for the hashes held between trims"""
+        return BloomFilter(2 * MAX_SEEN_TX_HASHES, self.seen_tx_error_rate)
+    
+    def _load_seen_tx(self):
+        """Populate the in-memory mirror of seen transaction hashes"""
+        for (chat_id,) in self._conn.execute("SELECT chat_id FROM users"):
+            self._seen_tx[chat_id] = self._new_seen_filter()
+        for chat_id, tx_hash in self._conn.execute("SELECT chat_id, tx_hash FROM seen_tx"):
+            if chat_id in self._seen_tx:
+                self._seen_tx[chat_id].add(tx_hash)
+    
+    def _trim_seen_tx_locked(self, chat_id: str):
+        """Keep only a user's newest hashes and rebuild their filter; caller holds the lock"""
+        self._flush_locked()
+        self._conn.execute(
+            "DELETE FROM seen_tx WHERE chat_id = ? AND tx_hash NOT IN "
+            "(SELECT tx_hash FROM seen_tx WHERE chat_id = ? ORDER BY seen_at DESC LIMIT ?)",
+            (chat_id, chat_id, MAX_SEEN_TX_HASHES)
+        )
+        seen = self._new_seen_filter()
+        for (tx_hash,) in self._conn.execute("SELECT tx_hash FROM seen_tx WHERE chat_id = ?", (chat_id,)):
+            seen.add(tx_hash)
+        # Hashes still queued after a failed flush aren't in the table yet
+        for pending_chat_id, tx_key in self._unflushed:
+            if pending_chat_id == chat_id:
+                seen.add(tx_key)
+        self._seen_tx[chat_id] = seen
+    
+    def _migrate_json(self, json_path: str):
+        """Import users from the old JSON database, then set the file aside"""
+        if not os.path.exists(json_path):
+            return
+        if self._conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            return
+        
+        try:
+            with open(json_path, 'rb') as f:
+                raw = json_loads(f.read())
+            
+            now = time.time()
+            with self._lock:
+                self._conn.execute("BEGIN")
+                for chat_id, data in raw.items():
+                    data = {_LEGACY_JSON_KEYS.get(key, key): value for key, value in data.items()}
+                    registered_at = data.get('registered_at')
+                    if isinstance(registered_at, str):
+                        # Older databases stored ISO timestamps; timestamps are now epoch seconds
+                        try:
+                            registered_at = datetime.fromisoformat(registered_at).timestamp()
+                        except ValueError:
+                            registered_at = None
+                    
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)",
+                        (chat_id, data['wallet_address'], data.get('username'),
+                         registered_at, int(data.get('active', True)))
+                    )
+                    # Hashes were stored oldest first; keep that order in seen_at
+                    hashes = data.get('seen_tx_hashes', [])[-MAX_SEEN_TX_HASHES:]
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO seen_tx VALUES (?, ?, ?)",
+                        [(chat_id, _tx_key(tx_hash), now - len(hashes) + i) for i, tx_hash in enumerate(hashes)]
+                    )
+                self._conn.execute("COMMIT")
+            
+            os.replace(json_path, f"{json_path}.migrated")
+            logger.info(f"Migrated {len(raw)} users from {json_path}")
+        except Exception as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            logger.error(f"Error migrating user database from {json_path}: {e}")
+    
+    def _migrate_rowid_table(self):
+        """Rebuild a seen_tx table created by older versions as WITHOUT ROWID"""
+        sql = self._conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'seen_tx'"
+        ).fetchone()[0]
+        if 'WITHOUT ROWID' in sql.upper():
+            return
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                self._conn.execute(_SEEN_TX_TABLE.format(name='seen_tx_new'))
+                self._conn.execute("INSERT OR IGNORE INTO seen_tx_new SELECT chat_id, tx_hash, seen_at FROM seen_tx")
+                self._conn.execute("DROP TABLE seen_tx")
+                self._conn.execute("ALTER TABLE seen_tx_new RENAME TO seen_tx")
+                self._conn.execute("CREATE INDEX seen_tx_by_age ON seen_tx (chat_id, seen_at)")
+                self._conn.execute("COMMIT")
+            logger.info("Rebuilt seen_tx table without rowids")
+        except Exception as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            logger.error(f"Error rebuilding seen_tx table: {e}")
+    
+    def _migrate_hex_hashes(self):
+        """Convert seen hashes stored as hex text by older versions to bytes"""
+        rows = self._conn.execute(
+            "SELECT chat_id, tx_hash FROM seen_tx WHERE typeof(tx_hash) = 'text'"
+        ).fetchall()
+        if not rows:
+            return
+        try:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                # Hex differing only by case, or already stored as bytes, maps to an
+                # existing key; those text rows are left behind and dropped
+                self._conn.executemany(
+                    "UPDATE OR IGNORE seen_tx SET tx_hash = ? WHERE chat_id = ? AND tx_hash = ?",
+                    [(_tx_key(tx_hash), chat_id, tx_hash) for chat_id, tx_hash in rows]
+                )
+                self._conn.execute("DELETE FROM seen_tx WHERE typeof(tx_hash) = 'text'")
+                self._conn.execute("COMMIT")
+            logger.info(f"Converted {len(rows)} seen transaction hashes to binary")
+        except Exception as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            logger.error(f"Error converting seen transaction hashes: {e}")
     
-    def _save(self):
-        """Save users to file"""
+    def _flush_loop(self):
+        """Periodically commit queued writes"""
+        while True:
+            self._dirty.wait()
+            time.sleep(self.flush_interval)
+            self.flush()
+    
+    def _flush_locked(self):
+        """Commit queued writes in one transaction; caller holds the lock"""
+        self._dirty.clear()
+        if not self._pending:
+            return
         try:
-            with open(self.filepath, 'w') as f:
-                json.dump(self.users, f, indent=2)
+            self._conn.execute("BEGIN")
+            # Runs of the same statement go through one executemany
+            for sql, run in groupby(self._pending, key=lambda write: write[0]):
+                self._conn.executemany(sql, [params for _, params in run])
+            self._conn.execute("COMMIT")
         except Exception as e:
+            if self._conn.in_transaction:
+                self._conn.execute("ROLLBACK")
+            # Keep the writes queued so the next flush retries them
+            self._dirty.set()
             logger.error(f"Error saving user database: {e}")
+            return
+        self._pending = []
+        self._unflushed.clear()
+    
+    def flush(self):
+        """Commit queued writes to disk"""
+        with self._lock:
+            self._flush_locked()
+    
+    def close(self):
+        """Flush queued writes and close the database connection"""
+        with self._lock:
+            self._flush_locked()
+            self._conn.close()
     
     def register_user(self, chat_id: str, wallet_address: str, username: str = None) -> bool:
         """Register a user with their wallet address"""
-        self.users[chat_id] = {
-            "wallet_address": wallet_address.lower(),
-            "username": username,
-            "registered_at": datetime.now(timezone.utc).isoformat(),
-            "seen_tx_hashes": [],
-            "active": True
-        }
-        self._save()
+        with self._lock:
+            self._flush_locked()
+            try:
+                self._conn.execute("BEGIN")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, 1)",
+                    (chat_id, wallet_address.lower(), username, time.time())
+                )
+                self._conn.execute("DELETE FROM seen_tx WHERE chat_id = ?", (chat_id,))
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logger.error(f"Error registering user {chat_id}: {e}")
+                return False
+            self._seen_tx[chat_id] = self._new_seen_filter()
         logger.info(f"Registered user {chat_id} with wallet {wallet_address[:10]}...")
         return True
     
     def unregister_user(self, chat_id: str) -> bool:
         """Unregister a user"""
-        if chat_id in self.users:
-            del self.users[chat_id]
-            self._save()
-            logger.info(f"Unregistered user {chat_id}")
-            return True
-        return False
+        with self._lock:
+            self._flush_locked()
+            try:
+                self._conn.execute("BEGIN")
+                deleted = self._conn.execute("DELETE FROM users WHERE chat_id = ?", (chat_id,)).rowcount
+                self._conn.execute("DELETE FROM seen_tx WHERE chat_id = ?", (chat_id,))
+                self._conn.execute("COMMIT")
+            except Exception as e:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                logger.error(f"Error unregistering user {chat_id}: {e}")
+                return False
+            self._seen_tx.pop(chat_id, None)
+        if not deleted:
+            return False
+        logger.info(f"Unregistered user {chat_id}")
+        return True
     
-    def get_user(self, chat_id: str) -> Optional[dict]:
+    def get_user(self, chat_id: str) -> Optional[UserRecord]:
         """Get user data by chat_id"""
-        return self.users.get(chat_id)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT wallet_address, username, registered_at, active FROM users WHERE chat_id = ?",
+                (chat_id,)
+            ).fetchone()
+        return UserRecord(row[0], row[1], row[2], bool(row[3])) if row else None
     
-    def get_all_active_users(self) -> Dict[str, dict]:
+    def get_all_active_users(self) -> Dict[str, UserRecord]:
         """Get all active users"""
-        return {cid: data for cid, data in self.users.items() if data.get('active', True)}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chat_id, wallet_address, username, registered_at FROM users WHERE active = 1"
+            ).fetchall()
+        return {row[0]: UserRecord(row[1], row[2], row[3], True) for row in rows}
+    
+    def get_state(self, key: str, default=None):
+        """Read a persisted bot-wide value"""
+        with self._lock:
+            self._flush_locked()
+            row = self._conn.execute("SELECT value FROM bot_state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
     
-    def add_seen_tx(self, chat_id: str, tx_hash: str):
-        """Add a transaction hash to user's seen list"""
-        if chat_id in self.users:
-            seen = self.users[chat_id].get('seen_tx_hashes', [])
-            if tx_hash not in seen:
-                seen.append(tx_hash)
-                # Keep only last 500 hashes per user
-                self.users[chat_id]['seen_tx_hashes'] = seen[-500:]
-                self._save()
+    def set_state(self, key: str, value):
+        """Persist a bot-wide value with the next flush"""
+        with self._lock:
+            self._pending.append(("INSERT OR REPLACE INTO bot_state VALUES (?, ?)", (key, value)))
+            self._dirty.set()
     
-    def has_seen_tx(self, chat_id: str, tx_hash: str) -> bool:
-        """Check if user has already seen this transaction"""
-        if chat_id in self.users:
-            return tx_hash in self.users[chat_id].get('seen_tx_hashes', [])
-        return False
+    def _has_seen_locked(self, chat_id: str, tx_key: bytes) -> bool:
+        """Exact check behind a Bloom filter hit; caller holds the lock"""
+        if (chat_id, tx_key) in self._unflushed:
+            return True
+        return self._conn.execute(
+            "SELECT 1 FROM seen_tx WHERE chat_id = ? AND tx_hash = ?", (chat_id, tx_key)
+        ).fetchone() is not None
+    
+    def count_seen_tx(self, chat_id: str) -> int:
+        """Number of transactions remembered for a user"""
+        seen = self._seen_tx.get(chat_id)
+        return seen.count if seen else 0
+    
+    def _add_seen_locked(self, chat_id: str, tx_key: bytes) -> bool:
+        """Queue a seen hash unless already recorded; caller holds the lock"""
+        seen = self._seen_tx.get(chat_id)
+        if seen is None or (tx_key in seen and self._has_seen_locked(chat_id, tx_key)):
+            return False
+        
+        self._pending.append(("INSERT OR IGNORE INTO seen_tx VALUES (?, ?, ?)",
+                              (chat_id, tx_key, time.time())))
+        self._unflushed.add((chat_id, tx_key))
+        seen.add(tx_key)
+        self._dirty.set()
+        
+        # Keep only the most recent hashes per user; a failed trim is retried on the next add
+        if seen.count >= 2 * MAX_SEEN_TX_HASHES:
+            try:
+                self._trim_seen_tx_locked(chat_id)
+            except Exception as e:
+                logger.error(f"Error trimming seen transactions for {chat_id}: {e}")
+        return True
+    
+    def add_seen_tx(self, chat_id: str, tx_hash: str) -> bool:
+        """Add a transaction hash to user's seen list, returning False if it was already there"""
+        tx_key = _tx_key(tx_hash)
+        with self._lock:
+            return self._add_seen_locked(chat_id, tx_key)
+    
+    def add_seen_txs(self, chat_id: str, tx_hashes) -> int:
+        """Add several transaction hashes to user's seen list, returning how many were new"""
+        tx_keys = [_tx_key(tx_hash) for tx_hash in tx_hashes]
+        with self._lock:
+            return sum(self._add_seen_locked(chat_id, tx_key) for tx_key in tx_keys)
 
 
 # =============================================================================
 # Telegram Bot
 # =============================================================================
 
+# Telegram allows ~30 messages/second overall and ~1 message/second per chat
+TELEGRAM_GLOBAL_RATE = 25
+TELEGRAM_GLOBAL_BURST = 30
+TELEGRAM_CHAT_RATE = 1.0
+TELEGRAM_CHAT_BURST = 1
+SEND_MAX_ATTEMPTS = 3
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+MESSAGE_SEPARATOR = "\n\n────────\n\n"
+
+WEI_PER_UNIT = 10 ** 18
+
+
+def wei_to_str(wei: int, places: int = 4, decimals: int = 18) -> str:
+    """Format a wei amount as a decimal string rounded to places digits, without floats"""
+    sign = '-' if wei < 0 else ''
+    scale = 10 ** (decimals - places)
+    whole, frac = divmod((abs(wei) + scale // 2) // scale, 10 ** places)
+    return f"{sign}{whole}.{frac:0{places}d}"
+
+
+FILL_NOTIFICATION_TEMPLATE = """\
+{emoji} <b>Order Filled!</b>
+
+📊 <b>Market:</b> {market_title}
+🎯 <b>Outcome:</b> {outcome_name}
+💹 <b>Action:</b> {action}
+
+📈 <b>Details:</b>
+• Shares: {amount_human}
+• Price: {price_human} USDT
+• Value: ~{value_usdt} USDT
+
+🔗 <a href="https://bscscan.com/tx/{tx_hash}">View Transaction</a>
+⏰ {executed_at}"""
+
+
 class TelegramBot:
     """Handles Telegram bot interactions"""
     
-    def __init__(self, bot_token: str):
+    def __init__(self, bot_token: str, pool_size: int = 10):
         self.bot_token = bot_token
         self.base_url = f"https://api.telegram.org/bot{bot_token}"
         self.last_update_id = 0
+        self.session = create_session(pool_maxsize=pool_size)
+        self._global_bucket = TokenBucket(rate=TELEGRAM_GLOBAL_RATE, capacity=TELEGRAM_GLOBAL_BURST)
+        self._chat_buckets: Dict[str, TokenBucket] = {}
+        self._chat_buckets_lock = threading.Lock()
+    
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        """Get (or create) the rate limiter for a chat"""
+        with self._chat_buckets_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = TokenBucket(rate=TELEGRAM_CHAT_RATE, capacity=TELEGRAM_CHAT_BURST)
+                self._chat_buckets[chat_id] = bucket
+            return bucket
+    
+    @staticmethod
+    def _retry_after(response) -> float:
+        """Extract the retry delay from a 429 response"""
+        try:
+            return float(json_loads(response.content)['parameters']['retry_after'])
+        except Exception:
+            return float(response.headers.get('Retry-After', 1))
     
     def send_message(self, chat_id: str, message: str, parse_mode: str = "HTML") -> bool:
-        """Send a message to a chat"""
+        """Send a message to a chat, respecting Telegram's rate limits"""
         try:
             url = f"{self.base_url}/sendMessage"
             payload = {
@@ -178,9 +703,21 @@ class TelegramBot:
                 "parse_mode": parse_mode,
                 "disable_web_page_preview": True
             }
-            response = requests.post(url, json=payload, timeout=10)
-            response.raise_for_status()
-            return True
+            body = json_dumps(payload)
+            for _ in range(SEND_MAX_ATTEMPTS):
+                self._chat_bucket(chat_id).consume()
+                self._global_bucket.consume()
+                response = self.session.post(url, data=body, headers=JSON_HEADERS, timeout=10)
+                if response.status_code == 429:
+                    # Pause the whole chat, so concurrent senders back off too
+                    retry_after = self._retry_after(response)
+                    logger.warning(f"Rate limited sending to {chat_id}, retrying in {retry_after}s")
+                    self._chat_bucket(chat_id).hold(retry_after)
+                    continue
+                response.raise_for_status()
+                return True
+            logger.error(f"Failed to send message to {chat_id}: still rate limited after {SEND_MAX_ATTEMPTS} attempts")
+            return False
         except Exception as e:
             logger.error(f"Failed to send message to {chat_id}: {e}")
             return False
@@ -192,11 +729,11 @@ class TelegramBot:
             params = {
                 "offset": self.last_update_id + 1,
                 "timeout": timeout,
-                "allowed_updates": ["message"]
+                "allowed_updates": '["message"]'  # JSON-serialized list
             }
-            response = requests.get(url, params=params, timeout=timeout + 10)
+            response = self.session.get(url, params=params, timeout=timeout + 10)
             response.raise_for_status()
-            data = response.json()
+            data = json_loads(response.content)
             
             if data.get("ok") and data.get("result"):
                 updates = data["result"]
@@ -208,8 +745,51 @@ class TelegramBot:
             logger.error(f"Error getting updates: {e}")
             return []
     
+    def set_webhook(self, url: str, secret_token: Optional[str] = None) -> bool:
+        """Ask Telegram to push updates to url instead of serving getUpdates"""
+        try:
+            payload = {"url": url, "allowed_updates": ["message"]}
+            if secret_token:
+                payload["secret_token"] = secret_token
+            response = self.session.post(f"{self.base_url}/setWebhook", data=json_dumps(payload),
+                                         headers=JSON_HEADERS, timeout=10)
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.error(f"Error setting webhook: {e}")
+            return False
+    
+    def delete_webhook(self) -> bool:
+        """Remove any webhook so getUpdates can be used"""
+        try:
+            response = self.session.post(f"{self.base_url}/deleteWebhook", timeout=10)
+            response.raise_for_status()
+            return True
+        except Exception as e:
+            logger.error(f"Error deleting webhook: {e}")
+            return False
+    
+    def send_messages(self, chat_id: str, messages: list) -> bool:
+        """Send several messages to a chat, combined into as few messages as possible"""
+        batch = ""
+        ok = True
+        for message in messages:
+            combined = f"{batch}{MESSAGE_SEPARATOR}{message}" if batch else message
+            if batch and len(combined) > TELEGRAM_MAX_MESSAGE_LENGTH:
+                ok = self.send_message(chat_id, batch) and ok
+                combined = message
+            batch = combined
+        if batch:
+            ok = self.send_message(chat_id, batch) and ok
+        return ok
+    
     def send_order_fill_notification(self, chat_id: str, fill_data: dict) -> bool:
         """Send a formatted order fill notification"""
+        return self.send_message(chat_id, self.format_order_fill_notification(fill_data))
+    
+    @staticmethod
+    def format_order_fill_notification(fill_data: dict) -> str:
+        """Format an order fill notification message"""
         try:
             market = fill_data.get('market', {})
             taker = fill_data.get('taker', {})
@@ -224,66 +804,101 @@ class TelegramBot:
             
             # Convert amounts from wei
             try:
-                amount_human = float(amount_filled) / 1e18
-                price_human = float(price_executed) / 1e18
-                value_usdt = amount_human * price_human
-            except:
+                amount_wei = int(amount_filled)
+                price_wei = int(price_executed)
+                amount_human = wei_to_str(amount_wei)
+                price_human = wei_to_str(price_wei)
+                value_usdt = wei_to_str(amount_wei * price_wei // WEI_PER_UNIT, places=2)
+            except (TypeError, ValueError):
+                logger.warning(f"Unexpected amounts in fill {tx_hash}: {amount_filled!r} @ {price_executed!r}")
                 amount_human = amount_filled
                 price_human = price_executed
-                value_usdt = 0
+                value_usdt = "0.00"
             
             emoji = "🟢" if quote_type == "Bid" else "🔴"
             action = "BUY" if quote_type == "Bid" else "SELL"
             
-            message = f"""
-{emoji} <b>Order Filled!</b>
-
-📊 <b>Market:</b> {market_title}
-🎯 <b>Outcome:</b> {outcome_name}
-💹 <b>Action:</b> {action}
-
-📈 <b>Details:</b>
-• Shares: {amount_human:.4f}
-• Price: {price_human:.4f} USDT
-• Value: ~{value_usdt:.2f} USDT
-
-🔗 <a href="https://bscscan.com/tx/{tx_hash}">View Transaction</a>
-⏰ {executed_at}
-"""
-            return self.send_message(chat_id, message.strip())
+            return FILL_NOTIFICATION_TEMPLATE.format(
+                emoji=emoji,
+                market_title=market_title,
+                outcome_name=outcome_name,
+                action=action,
+                amount_human=amount_human,
+                price_human=price_human,
+                value_usdt=value_usdt,
+                tx_hash=tx_hash,
+                executed_at=executed_at
+            )
             
         except Exception as e:
             logger.error(f"Error formatting fill notification: {e}")
-            return self.send_message(chat_id, f"⚠️ Order filled but error formatting: {e}")
+            return f"⚠️ Order filled but error formatting: {e}"
 
 
 # =============================================================================
 # Predict.fun API Client
 # =============================================================================
 
+# Default maximum number of concurrent requests to the predict.fun API
+PREDICT_API_CONCURRENCY = 8
+
+
+@lru_cache(maxsize=1024)
+def _order_matches_url(base_url: str, signer_address: str, first: int) -> str:
+    """Order-matches URL with its query string, encoded once per wallet"""
+    return f"{base_url}/v1/orders/matches?{urlencode({'signerAddress': signer_address, 'first': first})}"
+
+
 class PredictAPIClient:
     """Client for predict.fun API"""
     
-    def __init__(self, api_key: str, testnet: bool = False):
+    def __init__(self, api_key: str, testnet: bool = False, concurrency: int = PREDICT_API_CONCURRENCY):
         self.api_key = api_key
         self.base_url = "https://api-testnet.predict.fun" if testnet else "https://api.predict.fun"
         self.headers = {
             "x-api-key": api_key,
             "Content-Type": "application/json"
         }
+        # The request semaphore bounds concurrency, so that is all the pool needs
+        self.session = create_session(pool_maxsize=concurrency)
+        self.session.headers.update(self.headers)
+        self._request_slots = threading.BoundedSemaphore(concurrency)
+        # (signer, first) -> (etag, body digest, parsed response) of the last good response
+        self._matches_cache: Dict[tuple, tuple] = {}
     
-    def get_order_matches(self, signer_address: str, first: int = 20) -> dict:
-        """Get order match events (filled orders) for a signer address"""
-        url = f"{self.base_url}/v1/orders/matches"
-        params = {
-            "signerAddress": signer_address,
-            "first": str(first)
-        }
+    def retain_wallets(self, wallets):
+        """Drop cached order matches for wallets that are no longer polled"""
+        for key in [key for key in self._matches_cache if key[0] not in wallets]:
+            self._matches_cache.pop(key, None)
+    
+    def get_order_matches(self, signer_address: str, first: int = 20, cache: bool = True) -> dict:
+        """Get order match events (filled orders) for a signer address
+        
+        Returns the previous response object when nothing changed: sends
+        If-None-Match when an ETag is known, and a 304, or a 200 whose body is
+        byte-identical to the last one, reuses the previously parsed response.
+        cache=False skips keeping the response, for one-off fetches.
+        """
+        url = _order_matches_url(self.base_url, signer_address, first)
+        key = (signer_address, first)
+        cached = self._matches_cache.get(key)
+        headers = {"If-None-Match": cached[0]} if cached and cached[0] else None
         
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
+            with self._request_slots:
+                response = self.session.get(url, headers=headers, timeout=30)
+            if response.status_code == 304 and cached:
+                return cached[2]
             response.raise_for_status()
-            return response.json()
+            
+            digest = hashlib.blake2b(response.content, digest_size=16).digest()
+            if cached and cached[1] == digest:
+                data = cached[2]
+            else:
+                data = json_loads(response.content)
+            if cache and data.get('success'):
+                self._matches_cache[key] = (response.headers.get('ETag'), digest, data)
+            return data
         except Exception as e:
             logger.error(f"Error fetching order matches for {signer_address[:10]}...: {e}")
             return {"success": False, "data": []}
@@ -293,9 +908,13 @@ class PredictAPIClient:
 # Command Handlers
 # =============================================================================
 
+_ETH_ADDR_RE = re.compile(r'\A0x[0-9a-fA-F]{40}\Z')
+
+
 def is_valid_eth_address(address: str) -> bool:
     """Validate Ethereum address format"""
-    return bool(re.match(r'^0x[a-fA-F0-9]{40}$', address))
+    # Most bad input has the wrong length or prefix; reject it before the regex
+    return len(address) == 42 and address.startswith('0x') and _ETH_ADDR_RE.match(address) is not None
 
 
 def handle_start(bot: TelegramBot, chat_id: str, username: str):
@@ -351,7 +970,9 @@ def handle_register(bot: TelegramBot, db: UserDatabase, chat_id: str, username:
         return
     
     # Register the user
-    db.register_user(chat_id, wallet_address, username)
+    if not db.register_user(chat_id, wallet_address, username):
+        bot.send_message(chat_id, "❌ Registration failed. Please try again later.")
+        return
     
     short_addr = f"{wallet_address[:6]}...{wallet_address[-4:]}"
     bot.send_message(chat_id,
@@ -373,15 +994,17 @@ def handle_status(bot: TelegramBot, db: UserDatabase, chat_id: str):
         )
         return
     
-    wallet = user.get('wallet_address', 'Unknown')
+    wallet = user.wallet_address
     short_addr = f"{wallet[:6]}...{wallet[-4:]}"
-    registered_at = user.get('registered_at', 'Unknown')
-    seen_count = len(user.get('seen_tx_hashes', []))
+    registered_at = user.registered_at
+    registered_date = (datetime.fromtimestamp(registered_at, timezone.utc).strftime('%Y-%m-%d')
+                       if registered_at else 'Unknown')
+    seen_count = db.count_seen_tx(chat_id)
     
     bot.send_message(chat_id,
         f"📊 <b>Your Status</b>\n\n"
         f"📍 Portfolio: <code>{short_addr}</code>\n"
-        f"📅 Registered: {registered_at[:10]}\n"
+        f"📅 Registered: {registered_date}\n"
         f"📬 Orders tracked: {seen_count}\n"
         f"✅ Status: Active\n\n"
         f"Use /stop to unregister."
@@ -396,7 +1019,9 @@ def handle_stop(bot: TelegramBot, db: UserDatabase, chat_id: str):
         bot.send_message(chat_id, "ℹ️ You're not registered.")
         return
     
-    db.unregister_user(chat_id)
+    if not db.unregister_user(chat_id):
+        bot.send_message(chat_id, "❌ Could not unregister. Please try again later.")
+        return
     bot.send_message(chat_id,
         "👋 <b>Unregistered successfully!</b>\n\n"
         "You won't receive any more notifications.\n\n"
@@ -409,6 +1034,25 @@ def handle_help(bot: TelegramBot, chat_id: str):
     handle_start(bot, chat_id, None)
 
 
+@dataclass
+class CommandContext:
+    """Everything a command handler needs"""
+    bot: TelegramBot
+    db: UserDatabase
+    chat_id: str
+    username: str
+    args: str
+
+
+COMMAND_HANDLERS: Dict[str, Callable[[CommandContext], None]] = {
+    '/start': lambda ctx: handle_start(ctx.bot, ctx.chat_id, ctx.username),
+    '/register': lambda ctx: handle_register(ctx.bot, ctx.db, ctx.chat_id, ctx.username, ctx.args),
+    '/status': lambda ctx: handle_status(ctx.bot, ctx.db, ctx.chat_id),
+    '/stop': lambda ctx: handle_stop(ctx.bot, ctx.db, ctx.chat_id),
+    '/help': lambda ctx: handle_help(ctx.bot, ctx.chat_id),
+}
+
+
 def process_command(bot: TelegramBot, db: UserDatabase, message: dict):
     """Process an incoming command"""
     chat = message.get('chat', {})
@@ -426,120 +1070,310 @@ def process_command(bot: TelegramBot, db: UserDatabase, message: dict):
     
     logger.info(f"Command from {chat_id}: {command}")
     
-    if command == '/start':
-        handle_start(bot, chat_id, username)
-    elif command == '/register':
-        handle_register(bot, db, chat_id, username, args)
-    elif command == '/status':
-        handle_status(bot, db, chat_id)
-    elif command == '/stop':
-        handle_stop(bot, db, chat_id)
-    elif command == '/help':
-        handle_help(bot, chat_id)
+    handler = COMMAND_HANDLERS.get(command)
+    if handler:
+        handler(CommandContext(bot, db, chat_id, username, args))
     else:
         bot.send_message(chat_id, "❓ Unknown command. Use /help to see available commands.")
 
 
+# =============================================================================
+# Webhook Receiver
+# =============================================================================
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Receives updates pushed by Telegram and dispatches commands"""
+    
+    # Set by OrderNotifierBot.serve_webhook
+    notifier: 'OrderNotifierBot' = None
+    path_secret: str = ''
+    
+    @staticmethod
+    def _matches_secret(value: str, expected: str) -> bool:
+        """Constant-time comparison, so response timing doesn't leak the secret"""
+        return hmac.compare_digest(value.encode(), expected.encode())
+    
+    def do_POST(self):
+        if not self._matches_secret(self.path, f"/telegram/{self.path_secret}"):
+            self.send_error(404)
+            return
+        
+        if not self._matches_secret(self.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), self.path_secret):
+            self.send_error(403)
+            return
+        
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            update = json_loads(self.rfile.read(length))
+            if not isinstance(update, dict):
+                raise ValueError("update is not a JSON object")
+        except Exception as e:
+            logger.error(f"Invalid webhook payload: {e}")
+            self.send_error(400)
+            return
+        
+        # Acknowledge first so Telegram doesn't redeliver while we work
+        self.send_response(200)
+        self.end_headers()
+        
+        message = update.get('message')
+        if message and message.get('text'):
+            self.notifier.dispatch_command(message)
+    
+    def log_message(self, format, *args):
+        logger.debug(f"Webhook: {format % args}")
+
+
 # =============================================================================
 # Main Bot Loop
 # =============================================================================
 
+# Number of single-threaded command workers; each chat always uses the same one
+COMMAND_LANES = 4
+# Number of single-threaded notification senders, assigned to chats the same way
+SEND_LANES = 4
+# Startup initialization: API requests per second
+INIT_RATE_LIMIT = 10
+
+
 class OrderNotifierBot:
     """Main bot class that coordinates everything"""
     
     def __init__(self, config: Config):
         self.config = config
-        self.bot = TelegramBot(config.telegram_bot_token)
-        self.api = PredictAPIClient(config.predict_api_key, config.testnet)
-        self.db = UserDatabase()
-        self.running = False
-    
-    def check_orders_for_user(self, chat_id: str, user_data: dict):
-        """Check for new order fills for a specific user"""
-        wallet = user_data.get('wallet_address')
-        if not wallet:
-            return
+        # Command and send lanes can all be sending while getUpdates is open
+        self.bot = TelegramBot(config.telegram_bot_token, pool_size=COMMAND_LANES + SEND_LANES + 1)
+        # One request slot per poll worker, so POLL_CONCURRENCY bounds in-flight API calls
+        self.api = PredictAPIClient(config.predict_api_key, config.testnet,
+                                    concurrency=config.poll_concurrency)
+        self.db = UserDatabase(flush_interval=config.db_flush_interval,
+                               seen_tx_error_rate=config.seen_tx_error_rate)
+        # Wallets checked concurrently in a poll cycle (also used for startup initialization)
+        self.executor = ThreadPoolExecutor(max_workers=config.poll_concurrency, thread_name_prefix='poll')
+        self.command_lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'command-{i}')
+            for i in range(COMMAND_LANES)
+        ]
+        # Poll workers hand notifications off here instead of waiting on Telegram
+        self.send_lanes = [
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'send-{i}')
+            for i in range(SEND_LANES)
+        ]
+        # Set on shutdown; wakes the poll loop out of its wait between cycles
+        self._stop_event = threading.Event()
+        # Idle backoff: wallet -> consecutive idle checks / poll cycles left to skip
+        self._idle_checks: Dict[str, int] = {}
+        self._skip_cycles: Dict[str, int] = {}
+        # chat_id -> last order-matches response processed for that chat
+        self._last_matches: Dict[str, dict] = {}
+    
+    def active_chats_by_wallet(self) -> Dict[str, list]:
+        """Active chat ids grouped by registered wallet"""
+        chats_by_wallet: Dict[str, list] = defaultdict(list)
+        for chat_id, user in self.db.get_all_active_users().items():
+            if user.wallet_address:
+                chats_by_wallet[user.wallet_address].append(chat_id)
+        return chats_by_wallet
+    
+    def notify_new_fills(self, chat_id: str, response: dict, formatted: Dict[str, str]) -> bool:
+        """Notify a chat of fills in an order-matches response it hasn't seen, returning True if any
         
+        formatted caches messages by transaction hash across the chats sharing the response.
+        """
+        # The API client hands back the same object when the matches are unchanged
+        if response is self._last_matches.get(chat_id):
+            return False
+        
+        notifications = []
         try:
-            response = self.api.get_order_matches(wallet)
-            
-            if not response.get('success'):
-                return
-            
             for match in response.get('data', []):
                 tx_hash = match.get('transactionHash')
-                if tx_hash and not self.db.has_seen_tx(chat_id, tx_hash):
+                # Check and record the hash in one step
+                if tx_hash and self.db.add_seen_tx(chat_id, tx_hash):
                     # New order fill!
-                    self.db.add_seen_tx(chat_id, tx_hash)
-                    self.bot.send_order_fill_notification(chat_id, match)
+                    message = formatted.get(tx_hash)
+                    if message is None:
+                        message = formatted[tx_hash] = self.bot.format_order_fill_notification(match)
+                    notifications.append(message)
                     logger.info(f"Notified {chat_id} of order fill: {tx_hash[:16]}...")
-                    time.sleep(0.5)
-                    
         except Exception as e:
             logger.error(f"Error checking order fills for {chat_id}: {e}")
+        else:
+            # Skip this response object next time only once all of it was handled
+            self._last_matches[chat_id] = response
+        
+        # Send all of this cycle's fills for the chat together, in the background,
+        # including those found before any error above (they are already marked seen)
+        if not notifications:
+            return False
+        try:
+            lane = self.send_lanes[hash(chat_id) % len(self.send_lanes)]
+            lane.submit(self._send_notifications, chat_id, notifications)
+        except Exception as e:
+            logger.error(f"Error queueing notifications for {chat_id}: {e}")
+        return True
+    
+    def _send_notifications(self, chat_id: str, notifications: list):
+        try:
+            self.bot.send_messages(chat_id, notifications)
+        except Exception as e:
+            logger.error(f"Error sending notifications to {chat_id}: {e}")
+    
+    def check_orders_for_wallet(self, wallet: str, chat_ids: list) -> bool:
+        """Fetch a wallet's fills once and notify every chat registered to it"""
+        if self._stop_event.is_set():
+            return False
+        
+        response = self.api.get_order_matches(wallet)
+        if not response.get('success'):
+            return False
+        
+        # Each fill is formatted once, however many chats are notified of it
+        formatted: Dict[str, str] = {}
+        found = False
+        for chat_id in chat_ids:
+            found = self.notify_new_fills(chat_id, response, formatted) or found
+        return found
+    
+    def poll_wallet(self, wallet: str, chat_ids: list):
+        """Check a wallet unless it is backing off after repeated idle checks
+        
+        Each check without new fills doubles the number of cycles the wallet is
+        skipped, up to idle_backoff_max cycles between checks; any fill resets it.
+        Skipped cycles delay fill notifications, so this is off (1) by default.
+        """
+        if self.config.idle_backoff_max <= 1:
+            self.check_orders_for_wallet(wallet, chat_ids)
+            return
+        
+        skip = self._skip_cycles.get(wallet, 0)
+        if skip > 0:
+            self._skip_cycles[wallet] = skip - 1
+            return
+        
+        if self.check_orders_for_wallet(wallet, chat_ids):
+            self._idle_checks.pop(wallet, None)
+            return
+        
+        idle = self._idle_checks.get(wallet, 0) + 1
+        self._idle_checks[wallet] = idle
+        self._skip_cycles[wallet] = min(2 ** idle, max(self.config.idle_backoff_max, 1)) - 1
+    
+    def _prune_poll_state(self, chats_by_wallet: Dict[str, list]):
+        """Forget polling state and cached responses of chats and wallets no longer registered"""
+        active_chats = {chat_id for chat_ids in chats_by_wallet.values() for chat_id in chat_ids}
+        for chat_id in self._last_matches.keys() - active_chats:
+            del self._last_matches[chat_id]
+        for state in (self._idle_checks, self._skip_cycles):
+            for wallet in state.keys() - chats_by_wallet.keys():
+                del state[wallet]
+        self.api.retain_wallets(chats_by_wallet.keys())
     
     def poll_orders(self):
         """Poll for order activity for all registered users"""
-        while self.running:
+        while not self._stop_event.is_set():
             try:
-                users = self.db.get_all_active_users()
+                # One API call per wallet, however many chats registered it
+                chats_by_wallet = self.active_chats_by_wallet()
+                self._prune_poll_state(chats_by_wallet)
                 
-                for chat_id, user_data in users.items():
-                    if not self.running:
-                        break
-                    
-                    # Check for filled orders
-                    self.check_orders_for_user(chat_id, user_data)
-                    time.sleep(1)  # Small delay between users
+                # Check all wallets for filled orders concurrently; wallets are
+                # independent, so wall time is bounded by the slowest batch
+                # rather than the sum of every wallet's round trip
+                list(self.executor.map(
+                    lambda item: self.poll_wallet(*item),
+                    chats_by_wallet.items()
+                ))
                 
             except Exception as e:
                 logger.error(f"Error in order polling loop: {e}")
             
             # Wait before next poll cycle
-            for _ in range(self.config.poll_interval):
-                if not self.running:
-                    break
-                time.sleep(1)
+            if self._stop_event.wait(timeout=self.config.poll_interval):
+                return
+    
+    def dispatch_command(self, message: dict):
+        """Process a command in the background, keeping each chat's commands in order"""
+        chat_id = str(message.get('chat', {}).get('id'))
+        lane = self.command_lanes[hash(chat_id) % len(self.command_lanes)]
+        lane.submit(self._process_command, message)
+    
+    def _process_command(self, message: dict):
+        try:
+            process_command(self.bot, self.db, message)
+        except Exception as e:
+            logger.error(f"Error processing command: {e}")
     
     def handle_updates(self):
         """Handle incoming Telegram messages/commands"""
-        while self.running:
+        # Resume after the last update handled before a restart, so the final
+        # unacknowledged batch isn't delivered twice
+        self.bot.last_update_id = self.db.get_state('last_update_id', 0)
+        while not self._stop_event.is_set():
             try:
                 updates = self.bot.get_updates(timeout=30)
                 
                 for update in updates:
                     message = update.get('message')
                     if message and message.get('text'):
-                        process_command(self.bot, self.db, message)
+                        self.dispatch_command(message)
+                if updates:
+                    self.db.set_state('last_update_id', self.bot.last_update_id)
                         
             except Exception as e:
                 logger.error(f"Error handling updates: {e}")
                 time.sleep(5)
     
+    def _initialize_wallet(self, wallet: str, chat_ids: list, rate_limit: TokenBucket):
+        """Mark a wallet's existing filled orders as seen for every chat registered to it"""
+        try:
+            rate_limit.consume()
+            # Fetched once at startup; polling uses a smaller page, so don't cache it
+            response = self.api.get_order_matches(wallet, first=50, cache=False)
+            if response.get('success'):
+                tx_hashes = [
+                    match['transactionHash'] for match in response.get('data', [])
+                    if match.get('transactionHash')
+                ]
+                for chat_id in chat_ids:
+                    self.db.add_seen_txs(chat_id, tx_hashes)
+            
+            logger.info(f"Initialized {', '.join(chat_ids)}: marked existing orders as seen")
+        except Exception as e:
+            logger.error(f"Error initializing wallet {wallet[:10]}...: {e}")
+    
     def initialize_existing_users(self):
         """Mark existing orders as seen for all users (don't notify old activity)"""
         logger.info("Initializing existing users...")
-        users = self.db.get_all_active_users()
         
-        for chat_id, user_data in users.items():
-            wallet = user_data.get('wallet_address')
-            if not wallet:
-                continue
-            
-            try:
-                # Mark existing filled orders as seen
-                response = self.api.get_order_matches(wallet, first=50)
-                if response.get('success'):
-                    for match in response.get('data', []):
-                        tx_hash = match.get('transactionHash')
-                        if tx_hash:
-                            self.db.add_seen_tx(chat_id, tx_hash)
-                
-                logger.info(f"Initialized {chat_id}: marked existing orders as seen")
-            except Exception as e:
-                logger.error(f"Error initializing user {chat_id}: {e}")
-            
-            time.sleep(1)
+        # Fetch wallets in parallel on the poll workers (polling hasn't started
+        # yet), paced by a shared rate limit instead of fixed sleeps
+        rate_limit = TokenBucket(rate=INIT_RATE_LIMIT, capacity=INIT_RATE_LIMIT)
+        list(self.executor.map(
+            lambda item: self._initialize_wallet(*item, rate_limit),
+            self.active_chats_by_wallet().items()
+        ))
+    
+    def serve_webhook(self):
+        """Register the webhook with Telegram and serve pushed updates"""
+        # Telegram echoes the secret in a header; it also keeps the URL unguessable
+        secret = (self.config.webhook_secret or
+                  hashlib.sha256(self.config.telegram_bot_token.encode()).hexdigest()[:32])
+        WebhookHandler.notifier = self
+        WebhookHandler.path_secret = secret
+        server = ThreadingHTTPServer(('0.0.0.0', self.config.webhook_port), WebhookHandler)
+        server.daemon_threads = True
+        
+        url = f"{self.config.webhook_url.rstrip('/')}/telegram/{secret}"
+        if not self.bot.set_webhook(url, secret_token=secret):
+            server.server_close()
+            raise RuntimeError("Could not register Telegram webhook")
+        
+        logger.info(f"Receiving updates via webhook on port {self.config.webhook_port}")
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
     
     def run(self):
         """Start the bot"""
@@ -554,13 +1388,12 @@ class OrderNotifierBot:
         """)
         
         logger.info(f"Using {'testnet' if self.config.testnet else 'mainnet'} API")
-        logger.info(f"Poll interval: {self.config.poll_interval} seconds")
+        logger.info(f"Poll interval: {self.config.poll_interval} seconds "
+                    f"({self.config.poll_concurrency} concurrent checks)")
         
         # Initialize existing users
         self.initialize_existing_users()
         
-        self.running = True
-        
         # Start order polling in a separate thread
         poll_thread = threading.Thread(target=self.poll_orders, daemon=True)
         poll_thread.start()
@@ -570,12 +1403,24 @@ class OrderNotifierBot:
         logger.info("Bot is running! Waiting for commands...")
         
         try:
-            self.handle_updates()
+            if self.config.webhook_url:
+                self.serve_webhook()
+            else:
+                self.bot.delete_webhook()
+                self.handle_updates()
         except KeyboardInterrupt:
             logger.info("Shutting down...")
         finally:
-            self.running = False
+            self._stop_event.set()
             poll_thread.join(timeout=5)
+            # Let in-flight wallet checks finish queueing their notifications
+            # before the send lanes close (queued-but-unstarted checks are dropped)
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            # Deliver notifications already queued for fills marked as seen
+            for lane in self.send_lanes:
+                lane.shutdown(wait=True)
+            for lane in self.command_lanes:
+                lane.shutdown(wait=True)
             logger.info("Bot stopped")
 
 
@@ -584,6 +1429,8 @@ class OrderNotifierBot:
 # =============================================================================
 
 def main():
+    # Turn SIGTERM (container stop) into a normal exit so pending writes are flushed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     config = load_config()
     bot = OrderNotifierBot(config)
     bot.run()
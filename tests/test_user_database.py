@@ -0,0 +1,152 @@
+"""Tests for UserDatabase migrations and seen-transaction tracking"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predict_order_notifier import UserDatabase  # noqa: E402
+
+CHAT_ID = '1'
+WALLET = '0x' + '1' * 40
+HASH = '0x' + 'ab' * 32
+
+
+def create_legacy_db(path: str, hashes: list):
+    """Create a database as written by versions that stored hashes as hex text"""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (
+            chat_id TEXT PRIMARY KEY,
+            wallet_address TEXT NOT NULL,
+            username TEXT,
+            registered_at REAL,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE TABLE seen_tx (
+            chat_id TEXT NOT NULL,
+            tx_hash TEXT NOT NULL,
+            seen_at REAL NOT NULL,
+            PRIMARY KEY (chat_id, tx_hash)
+        );
+    """)
+    conn.execute("INSERT INTO users VALUES (?, ?, NULL, 0, 1)", (CHAT_ID, WALLET))
+    conn.executemany("INSERT INTO seen_tx VALUES (?, ?, ?)",
+                     [(CHAT_ID, tx_hash, i) for i, tx_hash in enumerate(hashes)])
+    conn.commit()
+    conn.close()
+
+
+class UserDatabaseTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'users.db')
+        self.json_path = os.path.join(self.tmp.name, 'users.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open_db(self) -> UserDatabase:
+        # Long interval so the background flusher stays out of the way; tests flush explicitly
+        db = UserDatabase(self.path, legacy_json_path=self.json_path, flush_interval=60)
+        self.addCleanup(db.close)
+        return db
+
+    def test_hex_migration_merges_colliding_hashes(self):
+        # Same hash in both cases, plus a text row whose bytes form already exists
+        create_legacy_db(self.path, [HASH, HASH.upper().replace('0X', '0x'), '0x' + 'cd' * 32])
+        conn = sqlite3.connect(self.path)
+        conn.execute("INSERT INTO seen_tx VALUES (?, ?, 9)", (CHAT_ID, bytes.fromhex('cd' * 32)))
+        conn.commit()
+        conn.close()
+
+        db = self.open_db()
+
+        rows = db._conn.execute("SELECT typeof(tx_hash), tx_hash FROM seen_tx ORDER BY tx_hash").fetchall()
+        self.assertEqual(rows, [('blob', bytes.fromhex('ab' * 32)), ('blob', bytes.fromhex('cd' * 32))])
+        self.assertFalse(db._conn.in_transaction)
+        self.assertFalse(db.add_seen_tx(CHAT_ID, HASH))
+        self.assertFalse(db.add_seen_tx(CHAT_ID, '0x' + 'cd' * 32))
+
+    def test_add_seen_tx_reports_new_hashes(self):
+        db = self.open_db()
+        db.register_user(CHAT_ID, WALLET)
+
+        self.assertTrue(db.add_seen_tx(CHAT_ID, HASH))
+        self.assertFalse(db.add_seen_tx(CHAT_ID, HASH))
+        db.flush()
+        self.assertEqual(db.count_seen_tx(CHAT_ID), 1)
+        self.assertFalse(db.add_seen_tx(CHAT_ID, HASH))
+
+    def test_failed_flush_keeps_writes_queued(self):
+        db = self.open_db()
+        db.register_user(CHAT_ID, WALLET)
+        db.add_seen_tx(CHAT_ID, HASH)
+
+        conn = db._conn
+        db._conn = FailingExecutemany(conn)
+        db.flush()
+        db._conn = conn
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM seen_tx").fetchone()[0], 0)
+        self.assertFalse(db.add_seen_tx(CHAT_ID, HASH))
+
+        db.flush()
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM seen_tx").fetchone()[0], 1)
+
+    def test_failed_registration_rolls_back(self):
+        db = self.open_db()
+        db.register_user(CHAT_ID, WALLET)
+        db.add_seen_tx(CHAT_ID, HASH)
+        db.flush()
+
+        conn = db._conn
+        db._conn = FailingWrites(conn, 'users')
+        self.assertFalse(db.register_user(CHAT_ID, '0x' + '2' * 40))
+        db._conn = FailingWrites(conn, 'seen_tx')
+        self.assertFalse(db.unregister_user(CHAT_ID))
+        db._conn = conn
+
+        self.assertFalse(conn.in_transaction)
+        self.assertEqual(db.get_user(CHAT_ID).wallet_address, WALLET)
+        self.assertEqual(db.count_seen_tx(CHAT_ID), 1)
+        self.assertTrue(db.register_user(CHAT_ID, '0x' + '3' * 40))
+        self.assertTrue(db.unregister_user(CHAT_ID))
+
+
+class FailingExecutemany:
+    """Connection proxy whose executemany raises, as on a full disk"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def executemany(self, sql, params):
+        raise sqlite3.OperationalError("database or disk is full")
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class FailingWrites:
+    """Connection proxy that fails writes to one table, as on a full disk"""
+
+    def __init__(self, conn, table):
+        self._conn = conn
+        self._table = table
+
+    def execute(self, sql, *params):
+        words = sql.split()
+        if words[0] in ('INSERT', 'DELETE') and self._table in words:
+            raise sqlite3.OperationalError("database or disk is full")
+        return self._conn.execute(sql, *params)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+"""Tests for the Telegram webhook receiver"""
+
+import http.client
+import os
+import sys
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from predict_order_notifier import WebhookHandler  # noqa: E402
+
+SECRET = 's3cret'
+PATH = f'/telegram/{SECRET}'
+UPDATE = b'{"update_id": 1, "message": {"chat": {"id": 1}, "text": "/status"}}'
+
+
+class RecordingNotifier:
+    """Stands in for OrderNotifierBot, recording dispatched commands"""
+
+    def __init__(self):
+        self.messages = []
+        self.dispatched = threading.Event()
+
+    def dispatch_command(self, message):
+        self.messages.append(message)
+        self.dispatched.set()
+
+
+class WebhookHandlerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.notifier = RecordingNotifier()
+        WebhookHandler.notifier = self.notifier
+        WebhookHandler.path_secret = SECRET
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), WebhookHandler)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def post(self, path=PATH, body=UPDATE, secret=SECRET) -> int:
+        conn = http.client.HTTPConnection(*self.server.server_address, timeout=5)
+        self.addCleanup(conn.close)
+        headers = {'Content-Type': 'application/json'}
+        if secret is not None:
+            headers['X-Telegram-Bot-Api-Secret-Token'] = secret
+        conn.request('POST', path, body=body, headers=headers)
+        return conn.getresponse().status
+
+    def test_valid_update_is_dispatched(self):
+        self.assertEqual(self.post(), 200)
+        # The handler acknowledges before dispatching
+        self.assertTrue(self.notifier.dispatched.wait(timeout=5))
+        self.assertEqual(self.notifier.messages, [{'chat': {'id': 1}, 'text': '/status'}])
+
+    def test_wrong_path_is_rejected(self):
+        self.assertEqual(self.post(path='/telegram/wrong'), 404)
+        self.assertEqual(self.post(path='/'), 404)
+        self.assertEqual(self.notifier.messages, [])
+
+    def test_missing_or_wrong_secret_header_is_rejected(self):
+        self.assertEqual(self.post(secret=None), 403)
+        self.assertEqual(self.post(secret='wrong'), 403)
+        self.assertEqual(self.notifier.messages, [])
+
+    def test_malformed_body_is_rejected(self):
+        self.assertEqual(self.post(body=b'{not json'), 400)
+        self.assertEqual(self.post(body=b'[1, 2]'), 400)
+        self.assertEqual(self.notifier.messages, [])
+
+
+if __name__ == '__main__':
+    unittest.main()